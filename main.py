@@ -1,10 +1,14 @@
 from abc import ABC
 import argparse
 import datetime
+import errno
+import functools
 import logging
+import os
+import socket
 import sqlite3
-import subprocess
 import signal
+import struct
 import sys
 from time import sleep
 
@@ -13,9 +17,34 @@ APPS_TABLE_NAME = "apps"
 TIME_TRACKING_TABLE_NAME = "time_tracking"
 TRACKED_APPS = ["code", "firefox", "pycharm", "konsole", "spotify", "nvim", "foot"]
 DEFAULT_SLEEP_TIME = 60
+DEFAULT_MIN_SLEEP_TIME = 5
+SLEEP_BACKOFF_FACTOR = 1.5
+EXIT_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGQUIT)
+
+# Linux proc connector (linux/connector.h, linux/cn_proc.h)
+NETLINK_CONNECTOR = 11
+NLMSG_DONE = 3
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_EVENT_NONE = 0x00000000
+PROC_EVENT_FORK = 0x00000001
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_COMM = 0x00000200
+PROC_EVENT_EXIT = 0x80000000
+_NLMSG_HEADER = struct.Struct("=IHHII")
+_CN_MSG_HEADER = struct.Struct("=IIIIHH")
+# what, cpu, timestamp_ns followed by process_pid, process_tgid of the event data
+# (parent_pid, parent_tgid for fork events, whose child_pid, child_tgid come right after)
+_PROC_EVENT_HEADER = struct.Struct("=IIQII")
+_PROC_EVENT_FORK_CHILD = struct.Struct("=II")
+_PROC_EVENT_COMM_LEN = 16
+# Seconds to wait for the kernel to acknowledge the subscription
+PROC_EVENTS_ACK_TIMEOUT = 1.0
 
 argparser = argparse.ArgumentParser()
 argparser.add_argument("--sleep-time", type=int, default=DEFAULT_SLEEP_TIME)
+argparser.add_argument("--min-sleep-time", type=int, default=DEFAULT_MIN_SLEEP_TIME)
 argparser.add_argument("--debug", action="store_true")
 argparser.add_argument("--clear-db", action="store_true")
 argparser.add_argument("--report", action="store_true")
@@ -24,40 +53,56 @@ argparser.add_argument("--hour-report", action="store_true")
 argparser.add_argument("--hour-report-for", type=str)
 argparser.add_argument("--add-minutes", type=str)
 argparser.add_argument("--for-apps", type=str)
-args = argparser.parse_args()
 
-logging.basicConfig(
-    level=logging.DEBUG if args.debug else logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s (main.py:%(lineno)s)"
-)
+# Skip building the prefixed message when the level is disabled,
+# the message itself is %-formatted lazily by logging
+def log_debug_app(app: str, message: str, *args):
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("[%s] " + message, app, *args)
 
-def log_debug_app(app: str, message: str):
-    logging.debug(f"[{app}] {message}")
+def log_info_app(app: str, message: str, *args):
+    if logging.getLogger().isEnabledFor(logging.INFO):
+        logging.info("[%s] " + message, app, *args)
 
-def log_info_app(app: str, message: str):
-    logging.info(f"[{app}] {message}")
+@functools.lru_cache
+def _build_insert_sql(table_name: str, columns: tuple[str, ...]) -> str:
+    values = ', '.join(['?' for _ in columns])
+    return f"INSERT INTO {table_name}({', '.join(columns)}) VALUES({values})"
 
 class SQLiteTable(ABC):
     _table_name = ""
     _columns_def = {}
+    _indexes_def = {}
+
+    def __init_subclass__(cls, **kwargs):
+        # Table definitions are static, so build their SQL once per subclass
+        super().__init_subclass__(**kwargs)
+        columns_def = ', '.join([f"{k} {v}" for k, v in cls._columns_def.items()])
+        cls._create_sql = f"CREATE TABLE IF NOT EXISTS {cls._table_name}({columns_def})"
+        cls._create_indexes_sql = [
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON {cls._table_name}({index_columns})"
+            for index_name, index_columns in cls._indexes_def.items()
+        ]
+        cls._drop_sql = f"DROP TABLE IF EXISTS {cls._table_name}"
+        cls._insert_sql = _build_insert_sql(cls._table_name, tuple(cls._columns_def))
 
     def create_table_if_not_exists(self, cur: sqlite3.Cursor):
-        columns_def = ', '.join([f"{k} {v}" for k, v in self._columns_def.items()])
-        cur.execute(f"CREATE TABLE IF NOT EXISTS {self._table_name}({columns_def})")
-        cur.connection.commit()
+        # Table and its indexes are created together
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(self._create_sql)
+        for create_index_sql in self._create_indexes_sql:
+            cur.execute(create_index_sql)
+        cur.execute("COMMIT")
     
     def drop_table_if_exists(self, cur: sqlite3.Cursor):
-        cur.execute(f"DROP TABLE IF EXISTS {self._table_name}")
-        cur.connection.commit()
+        cur.execute(self._drop_sql)
 
     def table_exists(self, cur: sqlite3.Cursor) -> bool:
-        cur.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{self._table_name}'")
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (self._table_name,))
         return cur.fetchone() is not None
 
     def insert(self, cur: sqlite3.Cursor, **kwargs):
-        values = ', '.join(['?' for _ in kwargs.values()])
-        cur.execute(f"INSERT INTO {self._table_name}({', '.join(kwargs.keys())}) VALUES({values})", tuple(kwargs.values()))
-        cur.connection.commit()
+        cur.execute(_build_insert_sql(self._table_name, tuple(kwargs.keys())), tuple(kwargs.values()))
 
 
 class AppsTable(SQLiteTable):
@@ -77,6 +122,16 @@ class TimeTrackingTable(SQLiteTable):
         "end_time": "TEXT",
         "seconds": "INTEGER"
     }
+    # Covering index: per-app SUM(seconds) reports are answered from the index alone
+    _indexes_def = {
+        "idx_time_tracking_app_id_seconds": "app_id, seconds"
+    }
+
+    def insert_record(self, cur: sqlite3.Cursor, app_id: int, start_time: str, end_time: str, seconds: int):
+        cur.execute(self._insert_sql, (app_id, start_time, end_time, seconds))
+
+    def insert_many(self, cur: sqlite3.Cursor, rows: list[tuple[int, str, str, int]]):
+        cur.executemany(self._insert_sql, rows)
 
     def join_apps_table(self, cur: sqlite3.Cursor):
         return cur.execute(f"SELECT {self._table_name}.*, {APPS_TABLE_NAME}.name FROM {self._table_name} JOIN {APPS_TABLE_NAME} ON {self._table_name}.app_id = {APPS_TABLE_NAME}.ROWID")
@@ -84,19 +139,86 @@ class TimeTrackingTable(SQLiteTable):
     def get_app_time_sum(self, cur: sqlite3.Cursor):
         return cur.execute(f"SELECT {APPS_TABLE_NAME}.name, SUM(seconds) FROM {self._table_name} JOIN {APPS_TABLE_NAME} ON {self._table_name}.app_id = {APPS_TABLE_NAME}.ROWID GROUP BY {APPS_TABLE_NAME}.name")
 
+    def get_app_time_sum_for(self, cur: sqlite3.Cursor, app_name: str) -> int | None:
+        return cur.execute(f"SELECT SUM(seconds) FROM {self._table_name} JOIN {APPS_TABLE_NAME} ON {self._table_name}.app_id = {APPS_TABLE_NAME}.ROWID WHERE {APPS_TABLE_NAME}.name=?", (app_name,)).fetchone()[0]
+
 apps_table = AppsTable()
 time_tracking_table = TimeTrackingTable()
-_cursor_to_close: sqlite3.Cursor | None = None
-_app_started_time: dict[str, datetime.datetime] = {}
 
-def pid_of(name: str) -> int | None:
-    res = subprocess.run(f"pidof -s {name}", shell=True, stdout=subprocess.PIPE)
-    if res.returncode != 0:
+def read_comm(pid: int | str) -> str | None:
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip()
+    except OSError:
+        # Process already exited
         return None
-    return int(res.stdout.decode().strip())
 
-def app_running(name: str) -> bool:
-    return pid_of(name) is not None
+def running_apps() -> set[str]:
+    # Single pass over /proc instead of spawning pidof for every tracked app
+    names = set()
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        name = read_comm(pid)
+        if name is not None:
+            names.add(name)
+    return names
+
+def tracked_app_pids() -> dict[int, str]:
+    pids = {}
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        name = read_comm(pid)
+        if name in TRACKED_APPS:
+            pids[int(pid)] = name
+    return pids
+
+def open_proc_events_socket() -> socket.socket | None:
+    if not hasattr(socket, "AF_NETLINK"):
+        return None
+    sock = None
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+        sock.bind((os.getpid(), CN_IDX_PROC))
+        op = struct.pack("=I", PROC_CN_MCAST_LISTEN)
+        cn_msg = _CN_MSG_HEADER.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(op), 0) + op
+        sock.send(_NLMSG_HEADER.pack(_NLMSG_HEADER.size + len(cn_msg), NLMSG_DONE, 0, 0, os.getpid()) + cn_msg)
+        # Subscription result only comes back as an ack event, outside the initial
+        # PID namespace the request is ignored and no ack arrives (recv times out)
+        sock.settimeout(PROC_EVENTS_ACK_TIMEOUT)
+        while True:
+            event = parse_proc_event(sock.recv(4096))
+            if event is not None and event[0] == PROC_EVENT_NONE:
+                break
+        # For ack events the first field of the event data is the error code
+        err = event[1]
+        if err != 0:
+            raise OSError(err, os.strerror(err))
+        sock.settimeout(None)
+    except OSError as e:
+        # Subscribing usually needs CAP_NET_ADMIN
+        logging.info("Process events are not available (%s), falling back to polling", e)
+        if sock is not None:
+            sock.close()
+        return None
+    return sock
+
+def parse_proc_event(data: bytes) -> tuple[int, int, int, str | None, tuple[int, int] | None] | None:
+    offset = _NLMSG_HEADER.size + _CN_MSG_HEADER.size
+    if len(data) < offset + _PROC_EVENT_HEADER.size:
+        return None
+    what, _, _, pid, tgid = _PROC_EVENT_HEADER.unpack_from(data, offset)
+    comm = None
+    child = None
+    data_offset = offset + _PROC_EVENT_HEADER.size
+    if what == PROC_EVENT_COMM:
+        comm = data[data_offset:data_offset + _PROC_EVENT_COMM_LEN].split(b"\0", 1)[0].decode(errors="replace")
+    elif what == PROC_EVENT_FORK:
+        if len(data) < data_offset + _PROC_EVENT_FORK_CHILD.size:
+            return None
+        child = _PROC_EVENT_FORK_CHILD.unpack_from(data, data_offset)
+    return what, pid, tgid, comm, child
 
 def encode_time(time: datetime.datetime) -> str:
     return time.isoformat()
@@ -105,165 +227,275 @@ def decode_time(time: str) -> datetime.datetime:
     return datetime.datetime.fromisoformat(time)
 
 def populate_apps_table_if_needed(cur: sqlite3.Cursor):
-    for app in TRACKED_APPS:
-        # If app is not in the table, insert it
-        if not cur.execute(f"SELECT * FROM {APPS_TABLE_NAME} WHERE name=?", (app,)).fetchone():
-            apps_table.insert(cur, name=app)
-    cur.connection.commit()
+    # Skip the write transaction when every tracked app is already present
+    placeholders = ', '.join(['?' for _ in TRACKED_APPS])
+    count, = cur.execute(f"SELECT COUNT(*) FROM {APPS_TABLE_NAME} WHERE name IN ({placeholders})", TRACKED_APPS).fetchone()
+    if count == len(TRACKED_APPS):
+        return
+    # UNIQUE constraint on name makes already present apps a no-op
+    cur.execute("BEGIN IMMEDIATE")
+    cur.executemany(f"INSERT OR IGNORE INTO {APPS_TABLE_NAME}(name) VALUES(?)", [(app,) for app in TRACKED_APPS])
+    cur.execute("COMMIT")
 
 def populate_time_tracking_table_if_needed(cur: sqlite3.Cursor):
     if not time_tracking_table.table_exists(cur):
         time_tracking_table.create_table_if_not_exists(cur)
-        cur.connection.commit()
-
-def _exit(signum, frame):
-    logging.debug("\n\nReceived signal %s", signum)
-    if _cursor_to_close is not None:
-        app_name_id_map = apps_table.get_app_name_id_mapping(_cursor_to_close)
-        for app, start in _app_started_time.items():
-            now = datetime.datetime.now()
-            secs = (now - start).seconds
-            time_tracking_table.insert(
-                cur,
-                app_id=app_name_id_map[app],
-                start_time=encode_time(start),
-                end_time=encode_time(now),
-                seconds=secs
-            )
-            log_debug_app(app, "App was running when signal was received")
-            log_info_app(app, f"Inserted time tracking record lasting from {now} ({secs // 60}m {secs % 60}s)")
-            cur.connection.commit()
-            log_debug_app(app, "Committed transaction")
 
-        print("\nClosing connection...", end="")
-        _cursor_to_close.connection.close()
-        print("OK")
-    sys.exit(0)
-
-def handle_exit_signals() -> None:
-    signal.signal(signal.SIGINT, _exit)
-    signal.signal(signal.SIGTERM, _exit)
-    signal.signal(signal.SIGQUIT, _exit)
-
-
-conn = sqlite3.connect(SQLITE_FILE)
-cur = conn.cursor()
-_cursor_to_close = cur
-handle_exit_signals()
-
-if args.clear_db:
-    logging.info("Clearing database")
-    apps_table.drop_table_if_exists(cur)
-    time_tracking_table.drop_table_if_exists(cur)
-    sys.exit(0)
-
-if args.report:
-    print("\nTotal time spent per app:")
-    for row in time_tracking_table.get_app_time_sum(cur):
-        app_name, total_s = row
-        h = total_s // 3600
-        m = (total_s % 3600) // 60
-        s = total_s % 60
-        # Print table
-        print("{:<20} {:02d}:{:02d}:{:02d}".format(app_name, h, m, s))
-    sys.exit(0)
-elif args.hour_report:
-    for row in time_tracking_table.get_app_time_sum(cur):
-        app_name, total_s = row
-        h = total_s / 3600
-        # Print table
-        print("{:<20} {:.1f}h".format(app_name, h))
-    sys.exit(0)
-elif args.hour_report_for:
-    for row in time_tracking_table.get_app_time_sum(cur):
-        app_name, total_s = row
-        if app_name == args.hour_report_for:
-            app_name, total_s = row
-            h = total_s / 3600
-            # Print table
-            print("{:.1f}".format(h))
-    sys.exit(0)
-elif args.add_minutes:
-    app_names = args.for_apps.split(",")
-    now = datetime.datetime.now()
-    ago = datetime.datetime.now() - datetime.timedelta(minutes=int(args.add_minutes))
-    for app_name in app_names:
-        time_tracking_table.insert(
-            cur,
-            app_id=apps_table.get_app_name_id_mapping(cur)[app_name],
-            start_time=encode_time(ago),
-            end_time=encode_time(now),
-            seconds=int(args.add_minutes) * 60
-        )
-        log_info_app(app_name, f"Added {args.add_minutes} minutes")
-    cur.connection.commit()
-    logging.info("Committed transaction")
-    sys.exit(0)
-elif args.report_last_entries:
-    # Show start time and end time of last n entries
-
-    # Use LIMIT in the future as improvement
-    for row in time_tracking_table.join_apps_table(cur).fetchall()[-args.report_last_entries:]:
-        app_id, start_time, end_time, seconds, app_name = row
-        start_time = decode_time(start_time).strftime("%Y-%m-%d %H:%M:%S")
-        end_time = decode_time(end_time).strftime("%Y-%m-%d %H:%M:%S")
-        hours = seconds // 3600
-        minutes = (seconds % 3600) // 60
-        seconds = seconds % 60
-        print("{:<10} | {} -> {} |  {:02d}h {:02d}m {:02d}s".format(app_name, start_time, end_time, hours, minutes, seconds))
-    sys.exit(0)
-
-
-
-apps_table.create_table_if_not_exists(cur)
-time_tracking_table.create_table_if_not_exists(cur)
-populate_apps_table_if_needed(cur)
-populate_time_tracking_table_if_needed(cur)
-
-app_name_id_mapping = apps_table.get_app_name_id_mapping(cur)
-
-
-logging.info("Starting main loop")
-logging.info("Tracking apps: %s", TRACKED_APPS)
-while True:
-    for app in TRACKED_APPS:
+class AppTracker:
+    def __init__(self, cur: sqlite3.Cursor):
+        self.cur = cur
+        self.app_started_time: dict[str, datetime.datetime] = {}
+        # Populated once at startup, apps table does not change while tracking
+        self.app_name_id_mapping: dict[str, int] = {}
+
+    def update_app_states(self, running: set[str]) -> bool:
+        # Bind hot attributes to locals
+        cur = self.cur
+        app_started_time = self.app_started_time
+        app_name_id_mapping = self.app_name_id_mapping
+        state_changed = False
+        # All apps in a cycle share the same timestamp
         now = datetime.datetime.now()
-        log_debug_app(app, "Checking state of the app")
-        if app_running(app):
-            log_debug_app(app, " App is running")
-            match _app_started_time.get(app):
+        now_iso = encode_time(now)
+        for app in TRACKED_APPS:
+            log_debug_app(app, "Checking state of the app")
+            start = app_started_time.get(app)
+            if app in running:
+                log_debug_app(app, " App is running")
                 # Non-present cycle ago but runs now
-                case None:
+                if start is None:
                     log_debug_app(app, "  App has just started running")
-                    _app_started_time[app] = now
+                    app_started_time[app] = now
+                    state_changed = True
                 # Present cycle ago and keeps running
-                case start:
-                    log_debug_app(app, f"  App has been running since {start}")
-                    pass
-        else:
-            log_debug_app(app, " App is not running")
-            match _app_started_time.get(app):
+                else:
+                    log_debug_app(app, "  App has been running since %s", start)
+            else:
+                log_debug_app(app, " App is not running")
                 # Non-present cycle ago and still not running
-                case None:
+                if start is None:
                     log_debug_app(app, "  App is not running and was not running before")
-                    pass
                 # Present cycle ago but stopped now
-                case start:
+                else:
                     log_debug_app(app, "  App has stopped running")
-                    log_debug_app(app, f"  App was running for {now - start}")
-                    secs = (now - start).seconds
-                    time_tracking_table.insert(
-                        cur,
-                        app_id=app_name_id_mapping[app],
-                        start_time=encode_time(start),
-                        end_time=encode_time(now),
-                        seconds=(now - start).seconds
-                    )
-                    log_debug_app(app, f"  Inserted time tracking record for {now - start} ({secs}s)")
-                    cur.connection.commit()
-                    log_debug_app(app, "  Committed transaction")
-                    del _app_started_time[app]
+                    delta = now - start
+                    log_debug_app(app, "  App was running for %s", delta)
+                    # timedelta.seconds drops whole days, sessions can last longer than that
+                    secs = int(delta.total_seconds())
+                    # Only cycles that write anything take the write lock
+                    if not cur.connection.in_transaction:
+                        cur.execute("BEGIN IMMEDIATE")
+                    # Exit handler must see the session either tracked or inserted, never
+                    # both (inserted twice) or neither (lost), so defer signals meanwhile
+                    old_mask = signal.pthread_sigmask(signal.SIG_BLOCK, EXIT_SIGNALS)
+                    try:
+                        time_tracking_table.insert_record(
+                            cur,
+                            app_id=app_name_id_mapping[app],
+                            start_time=encode_time(start),
+                            end_time=now_iso,
+                            seconds=secs
+                        )
+                        del app_started_time[app]
+                    finally:
+                        signal.pthread_sigmask(signal.SIG_SETMASK, old_mask)
+                    log_debug_app(app, "  Inserted time tracking record for %s (%ss)", delta, secs)
                     log_debug_app(app, "  Deleted app from tracking")
+                    state_changed = True
+        if cur.connection.in_transaction:
+            cur.execute("COMMIT")
+            logging.debug("Committed transaction")
+        return state_changed
+
+    def watch_proc_events(self, sock: socket.socket):
+        # Only react when the kernel reports a tracked app starting or exiting
+        pids = tracked_app_pids()
+        running = set(pids.values())
+        self.update_app_states(running)
+        while True:
+            try:
+                data = sock.recv(4096)
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    logging.warning("Receiving process events failed (%s), falling back to polling", e)
+                    sock.close()
+                    return
+                logging.debug("Process events were dropped, rescanning /proc")
+                pids = tracked_app_pids()
+            else:
+                event = parse_proc_event(data)
+                if event is None:
+                    continue
+                what, pid, tgid, comm, child = event
+                if what == PROC_EVENT_FORK:
+                    child_pid, child_tgid = child
+                    # Forked child keeps the parent's name until it execs or renames itself
+                    if child_pid == child_tgid and tgid in pids:
+                        pids[child_pid] = pids[tgid]
+                    continue
+                # Threads share the process name, only process-level events matter
+                if pid != tgid:
+                    continue
+                if what == PROC_EVENT_EXEC:
+                    name = read_comm(pid)
+                elif what == PROC_EVENT_COMM:
+                    name = comm
+                elif what == PROC_EVENT_EXIT:
+                    name = None
+                else:
+                    continue
+                if name in TRACKED_APPS:
+                    pids[pid] = name
+                else:
+                    pids.pop(pid, None)
+            if set(pids.values()) != running:
+                running = set(pids.values())
+                self.update_app_states(running)
+
+    def poll(self, max_sleep_time: float, min_sleep_time: float):
+        # Poll fast right after a state change and back off up to max_sleep_time while nothing changes
+        sleep_time = min(min_sleep_time, max_sleep_time)
+        while True:
+            state_changed = self.update_app_states(running_apps())
+            if state_changed:
+                sleep_time = min(min_sleep_time, max_sleep_time)
+            else:
+                sleep_time = min(sleep_time * SLEEP_BACKOFF_FACTOR, max_sleep_time)
+            logging.debug("Sleeping for %s seconds", sleep_time)
+            sleep(sleep_time)
+
+    def exit(self, signum, frame):
+        logging.debug("\n\nReceived signal %s", signum)
+        cur = self.cur
+        # Signal may arrive in the middle of a polling cycle transaction
+        if not cur.connection.in_transaction:
+            cur.execute("BEGIN IMMEDIATE")
+        rows = []
+        now = datetime.datetime.now()
+        now_iso = encode_time(now)
+        for app, start in self.app_started_time.items():
+            secs = int((now - start).total_seconds())
+            rows.append((self.app_name_id_mapping[app], encode_time(start), now_iso, secs))
+            log_debug_app(app, "App was running when signal was received")
+            log_info_app(app, "Inserted time tracking record lasting from %s (%sm %ss)", now, secs // 60, secs % 60)
+        if rows:
+            time_tracking_table.insert_many(cur, rows)
+        cur.execute("COMMIT")
+        logging.debug("Committed transaction")
 
-    logging.debug("Sleeping for %s seconds", args.sleep_time)
-    sleep(args.sleep_time)
+        print("\nClosing connection...", end="")
+        cur.connection.close()
+        print("OK")
+        sys.exit(0)
+
+def handle_exit_signals(handler) -> None:
+    for signum in EXIT_SIGNALS:
+        signal.signal(signum, handler)
+
+
+def main():
+    args = argparser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s (main.py:%(lineno)s)"
+    )
+
+    # Autocommit in the driver, transactions are opened explicitly where needed
+    conn = sqlite3.connect(SQLITE_FILE, isolation_level=None)
+    cur = conn.cursor()
+    # WAL + NORMAL sync avoids a full fsync on every commit
+    journal_mode, = cur.execute("PRAGMA journal_mode=WAL").fetchone()
+    if journal_mode.lower() != "wal":
+        logging.warning("Could not enable WAL journal mode, using %s", journal_mode)
+    cur.execute("PRAGMA synchronous=NORMAL")
+    # Keep report query temporaries and pages in memory, read pages via mmap
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-65536")
+    cur.execute("PRAGMA mmap_size=268435456")
+    tracker = AppTracker(cur)
+    handle_exit_signals(tracker.exit)
+
+    if args.clear_db:
+        logging.info("Clearing database")
+        apps_table.drop_table_if_exists(cur)
+        time_tracking_table.drop_table_if_exists(cur)
+        sys.exit(0)
+
+    if args.report:
+        lines = ["\nTotal time spent per app:\n"]
+        for row in time_tracking_table.get_app_time_sum(cur):
+            app_name, total_s = row
+            h, rem = divmod(total_s, 3600)
+            m, s = divmod(rem, 60)
+            # Print table
+            lines.append("{:<20} {:02d}:{:02d}:{:02d}\n".format(app_name, h, m, s))
+        # Single write instead of a print per row
+        sys.stdout.write("".join(lines))
+        sys.exit(0)
+    elif args.hour_report:
+        lines = []
+        for row in time_tracking_table.get_app_time_sum(cur):
+            app_name, total_s = row
+            h = total_s / 3600
+            # Print table
+            lines.append("{:<20} {:.1f}h\n".format(app_name, h))
+        sys.stdout.write("".join(lines))
+        sys.exit(0)
+    elif args.hour_report_for:
+        total_s = time_tracking_table.get_app_time_sum_for(cur, args.hour_report_for)
+        if total_s is not None:
+            h = total_s / 3600
+            print("{:.1f}".format(h))
+        sys.exit(0)
+    elif args.add_minutes:
+        app_names = args.for_apps.split(",")
+        now = datetime.datetime.now()
+        ago = datetime.datetime.now() - datetime.timedelta(minutes=int(args.add_minutes))
+        cur.execute("BEGIN IMMEDIATE")
+        for app_name in app_names:
+            time_tracking_table.insert(
+                cur,
+                app_id=apps_table.get_app_name_id_mapping(cur)[app_name],
+                start_time=encode_time(ago),
+                end_time=encode_time(now),
+                seconds=int(args.add_minutes) * 60
+            )
+            log_info_app(app_name, "Added %s minutes", args.add_minutes)
+        cur.execute("COMMIT")
+        logging.info("Committed transaction")
+        sys.exit(0)
+    elif args.report_last_entries:
+        # Show start time and end time of last n entries
+
+        # Use LIMIT in the future as improvement
+        for row in time_tracking_table.join_apps_table(cur).fetchall()[-args.report_last_entries:]:
+            app_id, start_time, end_time, seconds, app_name = row
+            start_time = decode_time(start_time).strftime("%Y-%m-%d %H:%M:%S")
+            end_time = decode_time(end_time).strftime("%Y-%m-%d %H:%M:%S")
+            hours = seconds // 3600
+            minutes = (seconds % 3600) // 60
+            seconds = seconds % 60
+            print("{:<10} | {} -> {} |  {:02d}h {:02d}m {:02d}s".format(app_name, start_time, end_time, hours, minutes, seconds))
+        sys.exit(0)
+
+    apps_table.create_table_if_not_exists(cur)
+    time_tracking_table.create_table_if_not_exists(cur)
+    populate_apps_table_if_needed(cur)
+    populate_time_tracking_table_if_needed(cur)
+
+    tracker.app_name_id_mapping = apps_table.get_app_name_id_mapping(cur)
+
+    logging.info("Starting main loop")
+    logging.info("Tracking apps: %s", TRACKED_APPS)
+
+    proc_events_socket = open_proc_events_socket()
+    if proc_events_socket is not None:
+        logging.info("Watching process events")
+        tracker.watch_proc_events(proc_events_socket)
+
+    tracker.poll(args.sleep_time, args.min_sleep_time)
+
+
+if __name__ == "__main__":
+    main()
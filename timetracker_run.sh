@@ -1,3 +1,13 @@
 #!/usr/bin/env bash
 
-python3 ./main.py "$@"
+# Prefer PyPy for the long-running tracker loop when it is new enough
+# (main.py needs Python 3.10+), override with PYTHON=...
+if [ -z "$PYTHON" ]; then
+    if command -v pypy3 > /dev/null && pypy3 -c 'import sys; sys.exit(sys.version_info < (3, 10))'; then
+        PYTHON=pypy3
+    else
+        PYTHON=python3
+    fi
+fi
+
+"$PYTHON" ./main.py "$@"